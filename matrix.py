@@ -1,35 +1,124 @@
+import io
+import re
 import numpy as np
 import sys
+from dataclasses import dataclass
 
 # --- Impostazioni ---
 n_states = 11          # Dimensione della matrice N x N
 orca_filename = "Lumi0gradi.out" # File per leggere gli elementi diagonali (i=j)
 dipoli_filename = "dipole_matrix.txt" # File per leggere gli elementi off-diagonali (0, j)
 
+# La forma della matrice è nota a tempo di import (n_states fisso): il
+# template di stampa viene generato una volta sola, con gli indici i,j già
+# inseriti come letterali, e riempito a fine corsa con una singola chiamata
+# a str.format — niente ciclo Python sulle N^2 righe di output.
+MATRIX_FMT = "\n".join(
+    f"{i:<3} {j:<3}  {{: 12.8f}} {{: 12.8f}} {{: 12.8f}}"
+    for i in range(n_states)
+    for j in range(n_states)
+) + "\n"
+
+# Pattern (bytes) per pre-filtrare le righe con i momenti di dipolo totali
+DIPOLE_LINE_PAT = re.compile(rb"Total Dipole Moment.*")
+_CHUNK_SIZE = 1 << 20  # 1 MiB per lettura a blocchi
+
+
+def scan_dipole_lines(filename, max_lines=None):
+    """Scansiona il file a blocchi da 1 MiB e raccoglie solo le righe
+    contenenti "Total Dipole Moment", restituendole come bytes separati
+    da newline (pronti per np.loadtxt). Le righe spezzate al confine tra
+    due blocchi vengono ricomposte tenendo la coda fino al newline successivo.
+    Se max_lines è dato, la scansione si ferma appena raggiunto quel numero
+    di righe, senza leggere il resto del file.
+    """
+    matches = []
+    tail = b""
+    with open(filename, 'rb', buffering=_CHUNK_SIZE) as f:
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            buf = tail + chunk
+            nl = buf.rfind(b"\n")
+            if nl == -1:
+                tail = buf
+                continue
+            matches.extend(DIPOLE_LINE_PAT.findall(buf[:nl]))
+            tail = buf[nl + 1:]
+            if max_lines is not None and len(matches) >= max_lines:
+                return b"\n".join(matches[:max_lines])
+    if tail:
+        matches.extend(DIPOLE_LINE_PAT.findall(tail))
+    if max_lines is not None:
+        matches = matches[:max_lines]
+    return b"\n".join(matches)
+
+
+@dataclass
+class TransitionDipole:
+    """Matrice dei momenti di transizione in forma simmetrica compatta.
+
+    Per costruzione solo la diagonale e la prima riga/colonna sono non
+    nulle: basta conservare diag (N, 3) e offdiag0 (N-1, 3). L'elemento
+    M[i, j] viene ricostruito al volo in O(1), la simmetria M[i, 0] =
+    M[0, i] è implicita e gli ~N^2 elementi nulli non vengono mai
+    materializzati in memoria.
+    """
+    diag: np.ndarray      # (N, 3): elementi (i, i)
+    offdiag0: np.ndarray  # (N-1, 3): elementi (0, j) con j >= 1
+
+    def __getitem__(self, ij):
+        i, j = ij
+        if i == j:
+            return self.diag[i]
+        if i == 0:
+            return self.offdiag0[j - 1]
+        if j == 0:
+            return self.offdiag0[i - 1]
+        return np.zeros(3)
+
+    def to_dense(self):
+        """Espande in una matrice densa (N, N, 3), per stampa/export."""
+        n = self.diag.shape[0]
+        dense = np.zeros((n, n, 3))
+        idx = np.arange(n)
+        dense[idx, idx] = self.diag
+        dense[0, 1:] = self.offdiag0
+        dense[1:, 0] = self.offdiag0
+        return dense
+
+
+def fill_symmetric(matrix):
+    """Completa in-place la parte triangolare inferiore di una matrice di
+    momenti di transizione (N, N, 3) copiando la parte superiore, con una
+    singola assegnazione vettorizzata invece di un ciclo Python.
+    """
+    iu = np.triu_indices(matrix.shape[0], k=1)
+    matrix[(iu[1], iu[0])] = matrix[iu]
+
 # --- Inizializzazione ---
-# Crea una matrice N x N x 3 riempita di zeri.
-# Soddisfa la Regola 3 (elementi i,j con i,j > 0 e i!=j sono zero).
-matrix = np.zeros((n_states, n_states, 3))
+# Forma compatta: solo diagonale (N, 3) e prima riga off-diagonale (N-1, 3).
+# La Regola 3 (elementi i,j con i,j > 0 e i!=j sono zero) è implicita nella
+# rappresentazione TransitionDipole, non serve allocare gli zeri.
+diag = np.zeros((n_states, 3))
+offdiag0 = np.zeros((n_states - 1, 3))
 
 # --- 1) Lettura Elementi Diagonali da orca.out ---
+# Due passate: prima si filtrano solo le righe interessanti (scansione a
+# blocchi), poi np.loadtxt le converte tutte in una singola chiamata C
+# vettorizzata, senza float() per-token a livello Python.
 diagonal_index = 0
 try:
-    with open(orca_filename, 'r') as f_orca:
-        print(f"Lettura elementi diagonali da '{orca_filename}'...")
-        for line_num, line in enumerate(f_orca):
-            line_content = line.strip()
-            if "Total Dipole Moment" in line_content:
-                if diagonal_index < n_states:
-                    try:
-                        parts = line_content.split()
-                        dipole_x = float(parts[-3])
-                        dipole_y = float(parts[-2])
-                        dipole_z = float(parts[-1])
-                        matrix[diagonal_index, diagonal_index] = [dipole_x, dipole_y, dipole_z]
-                        # print(f"DEBUG: Trovato diagonale {diagonal_index},{diagonal_index}: {matrix[diagonal_index, diagonal_index]}")
-                        diagonal_index += 1
-                    except (IndexError, ValueError) as e:
-                        print(f"Attenzione [orca.out]: Impossibile estrarre il momento di dipolo dalla riga {line_num+1}: '{line_content}'. Errore: {e}", file=sys.stderr)
+    print(f"Lettura elementi diagonali da '{orca_filename}'...")
+    dipole_lines = scan_dipole_lines(orca_filename, max_lines=n_states)
+    if dipole_lines:
+        try:
+            parsed = np.loadtxt(io.BytesIO(dipole_lines), usecols=(-3, -2, -1), ndmin=2)[:n_states]
+            diagonal_index = parsed.shape[0]
+            diag[:diagonal_index] = parsed
+        except (IndexError, ValueError) as e:
+            print(f"Attenzione [orca.out]: Impossibile estrarre i momenti di dipolo dalle righe filtrate. Errore: {e}", file=sys.stderr)
     print(f"Letti {diagonal_index} elementi diagonali.")
     # Controllo se sono stati trovati abbastanza elementi diagonali
     if diagonal_index < n_states:
@@ -44,36 +133,21 @@ except Exception as e:
 
 
 # --- 2) Lettura Elementi Riga 0 (0,j) da dipoli.txt ---
-transition_j = 1 # Indice per gli stati 0->1, 0->2, ... (parte da 1)
+# np.loadtxt converte l'intero file a 3 colonne in un'unica chiamata C:
+# niente split/float per riga, niente contatori, e max_rows sostituisce il
+# controllo esplicito su n_states.
 lines_read_dipoli = 0
 try:
-    with open(dipoli_filename, 'r') as f_dipoli:
-        print(f"Lettura elementi riga 0 da '{dipoli_filename}'...")
-        for line_num, line in enumerate(f_dipoli):
-            line_content = line.strip()
-            if not line_content: # Salta righe vuote
-                continue
-
-            # Controlla se abbiamo già letto abbastanza transizioni
-            if transition_j >= n_states:
-                print(f"Nota [dipoli.txt]: Raggiunto n_states ({n_states}). Ignoro riga {line_num+1} e successive.")
-                break # Esce dal ciclo for
-
-            try:
-                parts = line_content.split()
-                # Verifica che ci siano esattamente 3 colonne
-                if len(parts) == 3:
-                    trans_x = float(parts[0])
-                    trans_y = float(parts[1])
-                    trans_z = float(parts[2])
-                    matrix[0, transition_j] = [trans_x, trans_y, trans_z]
-                    # print(f"DEBUG: Trovato transizione 0,{transition_j}: {matrix[0, transition_j]}")
-                    transition_j += 1
-                    lines_read_dipoli += 1
-                else:
-                    print(f"Attenzione [dipoli.txt]: Riga {line_num+1} non contiene esattamente 3 colonne: '{line_content}'. Riga ignorata.", file=sys.stderr)
-            except ValueError as e:
-                print(f"Attenzione [dipoli.txt]: Impossibile convertire in numeri i valori sulla riga {line_num+1}: '{line_content}'. Errore: {e}. Riga ignorata.", file=sys.stderr)
+    print(f"Lettura elementi riga 0 da '{dipoli_filename}'...")
+    try:
+        data = np.loadtxt(dipoli_filename, max_rows=n_states - 1, ndmin=2)
+        if data.size and data.shape[1] != 3:
+            print(f"Attenzione [dipoli.txt]: Attese 3 colonne, trovate {data.shape[1]}. File ignorato.", file=sys.stderr)
+        elif data.size:
+            lines_read_dipoli = data.shape[0]
+            offdiag0[:lines_read_dipoli] = data
+    except ValueError as e:
+        print(f"Attenzione [dipoli.txt]: Impossibile convertire il file in una tabella numerica a 3 colonne. Errore: {e}", file=sys.stderr)
 
     print(f"Letti {lines_read_dipoli} elementi per la riga 0.")
     # Controllo se sono state lette abbastanza righe da dipoli.txt
@@ -90,20 +164,16 @@ except Exception as e:
 
 
 # --- 4) Simmetria per la Colonna 0 (i, 0 con i > 0) ---
-# Questo si basa sui valori letti da dipoli.txt e messi in matrix[0, j]
+# Implicita nella forma compatta: TransitionDipole restituisce offdiag0
+# sia per M(0, i) che per M(i, 0), nessuna copia necessaria.
 print("Applicazione simmetria per colonna 0...")
-for i in range(1, n_states):
-    matrix[i, 0] = matrix[0, i] # Copia M(0,i) in M(i,0)
+transition_matrix = TransitionDipole(diag=diag, offdiag0=offdiag0)
 
 
 # --- 5) Stampa della Matrice ---
+matrix = transition_matrix.to_dense()
 print(f"\n--- Matrice dei Momenti di Transizione ({n_states}x{n_states}) ---")
-for i in range(n_states):
-    for j in range(n_states):
-        # Formatta i valori con una precisione fissa per leggibilità
-        val_x = matrix[i, j, 0]
-        val_y = matrix[i, j, 1]
-        val_z = matrix[i, j, 2]
-        # Usa f-string per formattazione allineata
-        print(f"{i:<3} {j:<3}  {val_x: 12.8f} {val_y: 12.8f} {val_z: 12.8f}")
+# Il template precompilato MATRIX_FMT viene riempito con tutti i valori in
+# un'unica invocazione del formatter C, poi una sola write su stdout.
+sys.stdout.write(MATRIX_FMT.format(*matrix.reshape(-1)))
 print("--- Fine Matrice ---")
@@ -1,3 +1,4 @@
+import logging
 import sys
 
 def swap_specific_lines(input_filename, output_filename):
@@ -21,36 +22,50 @@ def swap_specific_lines(input_filename, output_filename):
     if indices_involved:
          max_index_needed = max(indices_involved)
 
+    # Solo le righe sorgente degli scambi vanno tenute in memoria
+    needed = set(content_source_map.values())
+
     try:
-        # Leggi tutte le righe dal file di input
-        with open(input_filename, 'r', encoding='utf-8') as infile:
-            original_lines = infile.readlines() # Legge tutte le righe, mantenendo i caratteri di newline '\n'
+        # Prima passata: scorri il file in streaming e conserva in cache
+        # soltanto le righe referenziate dalla mappa (memoria O(|mappa|),
+        # nessuna lista con l'intero file). La passata si ferma all'indice
+        # più alto coinvolto: il resto del file non serve in questa fase.
+        cache = {}
+        lines_scanned = 0
+        with open(input_filename, 'r', encoding='utf-8', buffering=1 << 20) as infile:
+            for idx, line in enumerate(infile):
+                lines_scanned = idx + 1
+                if idx in needed:
+                    cache[idx] = line
+                if idx >= max_index_needed:
+                    break # Tutte le righe utili sono già state viste
 
-        num_lines = len(original_lines)
-        print(f"File '{input_filename}' letto, {num_lines} righe trovate.")
+        print(f"File '{input_filename}' letto, prime {lines_scanned} righe scandite nella prima passata.")
 
         # Controlla se il file ha abbastanza righe per eseguire tutti gli scambi
         required_lines = max_index_needed + 1
-        if num_lines < required_lines:
-            print(f"Errore: Il file ha solo {num_lines} righe, ma lo scambio richiede almeno {required_lines} righe "
+        if lines_scanned < required_lines:
+            print(f"Errore: Il file ha solo {lines_scanned} righe, ma lo scambio richiede almeno {required_lines} righe "
                   f"(l'indice più alto coinvolto è {max_index_needed}, corrispondente alla riga {required_lines}).", file=sys.stderr)
             return # Interrompe l'esecuzione della funzione
 
-        # Crea una copia della lista originale su cui lavorare
-        # È importante usare la lista originale come sorgente per tutti gli scambi
-        new_lines = original_lines[:]
-
-        # Esegui gli scambi specificati nella mappa
-        print("Inizio scambi:")
-        for new_idx, old_idx in content_source_map.items():
-            # Prende il contenuto dalla riga 'old_idx' della lista *originale*
-            # e lo mette alla posizione 'new_idx' nella lista *nuova*.
-            print(f"  - La nuova riga {new_idx + 1} prenderà il contenuto dalla vecchia riga {old_idx + 1}")
-            new_lines[new_idx] = original_lines[old_idx]
+        # Riassumi tutti gli scambi in un unico messaggio: una sola
+        # emissione su stdout invece di una print per elemento della mappa
+        summary = "; ".join(
+            f"riga {new_idx + 1} <- riga {old_idx + 1}"
+            for new_idx, old_idx in content_source_map.items()
+        )
+        logging.info("Inizio scambi: %s", summary)
 
-        # Scrivi le righe modificate (e quelle non modificate) nel file di output
-        with open(output_filename, 'w', encoding='utf-8') as outfile:
-            outfile.writelines(new_lines)
+        # Seconda passata: ricopia il file riga per riga sostituendo al volo
+        # le righe presenti nella mappa, con output bufferizzato da 1 MiB
+        with open(input_filename, 'r', encoding='utf-8', buffering=1 << 20) as infile, \
+             open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as outfile:
+            for idx, line in enumerate(infile):
+                if idx in content_source_map:
+                    outfile.write(cache[content_source_map[idx]])
+                else:
+                    outfile.write(line)
 
         print("-" * 20)
         print(f"Scambi completati con successo.")
@@ -73,6 +88,8 @@ def swap_specific_lines(input_filename, output_filename):
 
 # --- Blocco Principale: Imposta i nomi dei file e chiama la funzione ---
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # <<< MODIFICA QUESTI NOMI SE NECESSARIO >>>
     nome_file_input = "input.txt"
     nome_file_output = "output.txt"
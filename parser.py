@@ -29,12 +29,15 @@ Notes
 from __future__ import annotations
 
 import argparse
+import hashlib
 import logging
+import mmap
 import re
+import shutil
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Iterable, List, Optional, Sequence
 
 
 # ---------------------------- Configuration ---------------------------------
@@ -47,75 +50,142 @@ MASS_BY_SYMBOL = {
     "H": 1,
 }
 
-GEOM_HEADER_PATTERN = re.compile(r"CARTESIAN\s+COORDINATES\s*\(ANGSTROEM\)", re.IGNORECASE)
+# Pre-stringified masses so the hot transform path does a single dict lookup
+# per row instead of a lookup plus str() conversion
+MASS_STR = {k: str(v) for k, v in MASS_BY_SYMBOL.items()}
 
-# Capture the first non-whitespace token and preserve everything that follows
-FIRST_TOKEN_RE = re.compile(r"^(?P<lead_ws>\s*)(?P<tok>\S+)(?P<rest>.*)$")
+# Bytes-keyed masses: the transform operates on the undecoded buffer
+MASS_BYTES = {k.encode("ascii"): v.encode("ascii") for k, v in MASS_STR.items()}
 
+# Flat lookup table indexed by the symbol's byte value: for the common
+# single-character symbols this replaces dict hashing with one list index
+MASS_LUT: List[Optional[bytes]] = [None] * 128
+for _sym, _mass_b in MASS_BYTES.items():
+    if len(_sym) == 1:
+        MASS_LUT[_sym[0]] = _mass_b
 
-# ------------------------------ Data types ----------------------------------
+# Matches a known atomic symbol as the first token of a row; the lookahead
+# keeps the following whitespace untouched so column alignment is preserved
+SYMBOL_ROW_RE = re.compile(
+    rb"(?m)^([ \t]*)(" + b"|".join(map(re.escape, sorted(MASS_BYTES))) + rb")(?=\s|$)"
+)
 
-@dataclass
-class GeometryBlock:
-    start_line: int  # inclusive index of the first data line
-    end_line: int    # exclusive index (one past the last geometry line)
-    lines: List[str]
+# First token of every non-blank row, for unknown-symbol detection
+FIRST_TOKEN_RE = re.compile(rb"(?m)^\s*(\S+)")
 
+# Literal header as emitted by ORCA; tried first with a plain bytes find
+GEOM_HEADER_LITERAL = b"CARTESIAN COORDINATES (ANGSTROEM)"
 
-# ------------------------------ Core logic ----------------------------------
+# Fallback for case/whitespace variants of the header
+GEOM_HEADER_PATTERN = re.compile(rb"CARTESIAN\s+COORDINATES\s*\(ANGSTROEM\)", re.IGNORECASE)
 
-def find_geometry_block(lines: Sequence[str]) -> Optional[GeometryBlock]:
-    """Locate and return the geometry block.
+# A blank line (possibly containing only spaces/tabs) terminates the block
+BLANK_LINE_RE = re.compile(rb"\n[ \t\r]*\n")
 
-    The geometry block starts two lines *after* the header line matching
-    GEOM_HEADER_PATTERN and continues until (but not including) the first
-    blank line.
-    """
-    header_idx: Optional[int] = None
-    for i, line in enumerate(lines):
-        if GEOM_HEADER_PATTERN.search(line):
-            header_idx = i
-            break
 
-    if header_idx is None:
-        logging.info("Geometry header not found.")
-        return None
 
-    # Start two lines after the header line
-    start = header_idx + 2
-    if start >= len(lines):
-        return None
+# ------------------------------ Data types ----------------------------------
 
-    # Consume until first blank line
-    end = start
-    while end < len(lines) and lines[end].strip():
-        end += 1
+@dataclass
+class GeometryBlock:
+    start_offset: int  # inclusive byte offset of the first data line
+    end_offset: int    # exclusive byte offset (one past the last geometry line)
+    raw: bytes         # undecoded geometry block
 
-    if end <= start:
-        return None
+    @property
+    def lines(self) -> List[str]:
+        """Decoded block lines (convenience for str-level consumers)."""
+        return self.raw.decode("utf-8", errors="replace").splitlines(keepends=True)
 
-    block_lines = list(lines[start:end])
-    return GeometryBlock(start_line=start, end_line=end, lines=block_lines)
 
+# ------------------------------ Core logic ----------------------------------
 
-def symbol_to_mass_token(token: str, strict: bool = False) -> str:
-    """Map an atomic symbol to its integer mass string if known.
+def find_geometry_block(path: Path) -> Optional[GeometryBlock]:
+    """Locate and return the geometry block of the file at *path*.
+
+    The geometry block starts two lines *after* the header line matching
+    GEOM_HEADER_PATTERN and continues until (but not including) the first
+    blank line.
 
-    If token is a known symbol, return its mass as a string. Otherwise,
-    return the token unchanged and optionally warn/raise when strict=True.
+    The file is memory-mapped and searched at the bytes level, so no Python
+    string objects are allocated for the (potentially very long) prefix
+    before the header; only the geometry block itself is ever decoded.
+    """
+    with path.open("rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return None
+        with mm:
+            # Literal find first: a single native memchr-style scan. Only if
+            # the exact header is absent fall back to the tolerant regex.
+            header_pos = mm.find(GEOM_HEADER_LITERAL)
+            if header_pos == -1:
+                header = GEOM_HEADER_PATTERN.search(mm)
+                if header is None:
+                    logging.info("Geometry header not found.")
+                    return None
+                header_pos = header.start()
+
+            # Start two lines after the header line
+            nl = mm.find(b"\n", header_pos)
+            if nl != -1:
+                nl = mm.find(b"\n", nl + 1)
+            if nl == -1:
+                return None
+            start = nl + 1
+            if start >= len(mm):
+                return None
+
+            # Consume until first blank line
+            blank = BLANK_LINE_RE.search(mm, max(start - 1, 0))
+            end = blank.start() + 1 if blank else len(mm)
+
+            if end <= start:
+                return None
+
+            raw = mm[start:end]
+
+    return GeometryBlock(start_offset=start, end_offset=end, raw=raw)
+
+
+def _mass_token(tok: bytes) -> bytes:
+    """Mass bytes for a matched symbol: LUT fast path for 1-byte symbols."""
+    if len(tok) == 1:
+        return MASS_LUT[tok[0]]
+    return MASS_BYTES[tok]
+
+
+def transform_geometry_block(buf: bytes, strict: bool = False) -> bytes:
+    """Rewrite every leading atomic symbol in an undecoded geometry block.
+
+    Same semantics as transform_geometry_lines, but the search, substitution
+    and output assembly all run in C over the raw bytes — no per-line Python
+    string objects are ever created, and the block is never decoded. For
+    blocks with thousands of atoms this is the pure-stdlib equivalent of
+    dropping the row loop into a compiled extension.
     """
-    if token in MASS_BY_SYMBOL:
-        return str(MASS_BY_SYMBOL[token])
+    transformed = SYMBOL_ROW_RE.sub(
+        lambda m: m.group(1) + _mass_token(m.group(2)), buf
+    )
 
-    if strict:
-        raise ValueError(
-            f"Unrecognized atomic symbol '{token}' in geometry block; "
-            f"supported: {sorted(MASS_BY_SYMBOL)}"
-        )
-    logging.warning(
-        "Unrecognized first token '%s' in geometry row; leaving unchanged.", token
+    unknown = sorted(
+        {tok for tok in FIRST_TOKEN_RE.findall(buf) if tok not in MASS_BYTES}
     )
-    return token
+    if unknown:
+        names = ", ".join(t.decode("utf-8", errors="replace") for t in unknown)
+        if strict:
+            raise ValueError(
+                f"Unrecognized atomic symbol "
+                f"'{unknown[0].decode('utf-8', 'replace')}' in geometry block; "
+                f"supported: {sorted(MASS_BY_SYMBOL)}"
+            )
+        logging.warning(
+            "Unrecognized first token(s) %s in geometry rows; left unchanged.",
+            names,
+        )
+    return transformed
 
 
 def transform_geometry_lines(raw_lines: Iterable[str], strict: bool = False) -> List[str]:
@@ -123,55 +193,74 @@ def transform_geometry_lines(raw_lines: Iterable[str], strict: bool = False) ->
 
     For example:  "N   1   1   1"  →  "14   1   1   1".
     Leading whitespace and the remainder of the line are preserved exactly.
+    Blank or whitespace-only rows are kept as-is.
+
+    Thin str-level wrapper over transform_geometry_block.
     """
-    out_lines: List[str] = []
-    for line in raw_lines:
-        m = FIRST_TOKEN_RE.match(line.rstrip("\n"))
-        if not m:
-            # Unlikely due to regex, but handle gracefully
-            out_lines.append(line)
-            continue
-        lead_ws = m.group("lead_ws")
-        tok = m.group("tok")
-        rest = m.group("rest")
-        new_tok = symbol_to_mass_token(tok, strict=strict)
-        out_lines.append(f"{lead_ws}{new_tok}{rest}\n")
-    return out_lines
+    buf = "".join(raw_lines).encode("utf-8")
+    return (
+        transform_geometry_block(buf, strict=strict)
+        .decode("utf-8")
+        .splitlines(keepends=True)
+    )
 
 
 # ----------------------------- I/O Utilities --------------------------------
 
-def read_text_lines(path: Path, encoding: str = "utf-8", errors: str = "replace") -> List[str]:
-    with path.open("r", encoding=encoding, errors=errors) as f:
-        return f.readlines()
+def write_text_lines(path: Path, lines: Iterable[str], encoding: str = "utf-8") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 1 MiB buffer + single joined write: the whole file goes out in one or
+    # two write(2) syscalls regardless of line count
+    with path.open("w", encoding=encoding, newline="\n", buffering=1 << 20) as f:
+        f.write("".join(lines))
 
 
-def write_text_lines(path: Path, lines: Iterable[str], encoding: str = "utf-8") -> None:
+def write_bytes(path: Path, data: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding=encoding, newline="\n") as f:
-        for ln in lines:
-            f.write(ln)
+    with path.open("wb", buffering=1 << 20) as f:
+        f.write(data)
 
 
 # ------------------------------ Orchestration -------------------------------
 
+def _cache_key(inp: Path, strict: bool) -> str:
+    """Cache key for a parse of *inp*: path + size + mtime_ns + strictness."""
+    st = inp.stat()
+    return hashlib.blake2b(
+        f"{inp.resolve()}|{st.st_size}|{st.st_mtime_ns}|{strict}".encode()
+    ).hexdigest()
+
+
 def generate_geometry_file(inp: Path, outdir: Path, strict: bool = False) -> Path:
     """Parse the geometry block from *inp* and write geometry.txt to *outdir*.
 
+    Results are memoized on disk under *outdir*/.cache keyed by the input
+    file's path, size and mtime, so re-running the pipeline on an unchanged
+    .out file skips the parse entirely.
+
     Returns the output path.
     """
-    all_lines = read_text_lines(inp)
-    block = find_geometry_block(all_lines)
+    out_path = outdir / "geometry.txt"
+    cache_dir = outdir / ".cache"
+    cached = cache_dir / f"{_cache_key(inp, strict)}.txt"
+    if cached.exists():
+        logging.info("Geometry cache hit: %s", cached)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cached, out_path)
+        return out_path
+
+    block = find_geometry_block(inp)
     if block is None:
         raise RuntimeError(
             "Failed to locate geometry block starting two lines after the "
             "'CARTESIAN COORDINATES (ANGSTROEM)' header."
         )
 
-    transformed = transform_geometry_lines(block.lines, strict=strict)
-    out_path = outdir / "geometry.txt"
-    write_text_lines(out_path, transformed)
-    logging.info("Wrote geometry: %s (\u2192 %d lines)", out_path, len(transformed))
+    transformed = transform_geometry_block(block.raw, strict=strict)
+    write_bytes(out_path, transformed)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(out_path, cached)
+    logging.info("Wrote geometry: %s (\u2192 %d lines)", out_path, transformed.count(b"\n"))
     return out_path
 
 